@@ -0,0 +1,50 @@
+"""change_feed.py - Mantiene índices en memoria al día con el change feed de Cosmos DB."""
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+ReadChanges = Callable[[Optional[str], int], Tuple[List[Dict[str, Any]], Optional[str]]]
+
+
+class ChangeFeedFollower:
+    """
+    Lee el change feed desde el último cursor y pasa cada documento a los
+    consumidores (por ejemplo RepairSearchIndex.add). La primera lectura,
+    sin cursor, recorre el contenedor desde el principio: reconstruye los índices.
+    """
+
+    def __init__(
+        self,
+        read_changes: ReadChanges,
+        consumers: Iterable[Callable[[Dict[str, Any]], None]],
+        page_size: int = 500,
+    ) -> None:
+        self._read_changes = read_changes
+        self._consumers = list(consumers)
+        self._page_size = page_size
+        self._lock = threading.Lock()
+        self.cursor: Optional[str] = None
+        self.synced_at = 0.0
+
+    def catch_up(self, min_interval: float = 0.0) -> int:
+        """
+        Aplica los cambios pendientes y devuelve cuántos documentos ha leído.
+        No hace nada si la última sincronización fue hace menos de min_interval segundos.
+        """
+        with self._lock:
+            if time.monotonic() - self.synced_at < min_interval:
+                return 0
+            read = 0
+            while True:
+                docs, cursor = self._read_changes(self.cursor, self._page_size)
+                for doc in docs:
+                    for consumer in self._consumers:
+                        consumer(doc)
+                read += len(docs)
+                self.cursor = cursor
+                # Cada lectura devuelve un solo rango de particiones: una página
+                # corta no significa que no queden cambios, solo una vacía.
+                if not docs:
+                    break
+            self.synced_at = time.monotonic()
+            return read
@@ -1,10 +1,23 @@
 """database.py - Acceso a datos para la Repair API usando Azure Cosmos DB."""
+import json
+import logging
 import os
+import random
+import time
+from collections import Counter
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
-from azure.cosmos import CosmosClient, exceptions
+from azure.core import MatchConditions
+from azure.cosmos import CosmosClient, PartitionKey, exceptions
+
+from container_spec import (
+    CLOSED_STATUSES,
+    CLOSED_TICKET_TTL_SECONDS,
+    CONTAINER_SPEC,
+    diff_container_spec,
+)
 
 # Cargar variables de entorno en local (.env)
 load_dotenv()
@@ -14,6 +27,18 @@ COSMOS_KEY = os.getenv("COSMOS_KEY")
 COSMOS_DB_NAME = os.getenv("COSMOS_DATABASE")
 COSMOS_CONTAINER_NAME = os.getenv("COSMOS_CONTAINER", "Repairs")
 
+# Diagnóstico: umbral (ms) a partir del cual una llamada va al slow-query log
+# y fracción de queries para las que pedimos a Cosmos el desglose de métricas.
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500"))
+QUERY_METRICS_SAMPLE_RATE = float(os.getenv("QUERY_METRICS_SAMPLE_RATE", "0.05"))
+
+# Si es true, la API no arranca cuando la política en vivo del contenedor no
+# coincide con container_spec.json (por defecto solo se avisa en el log).
+STRICT_CONTAINER_POLICY = os.getenv("STRICT_CONTAINER_POLICY", "false").lower() == "true"
+
+logger = logging.getLogger("repairs_api")
+slow_query_logger = logging.getLogger("repairs_api.slow_query")
+
 if not all([COSMOS_URL, COSMOS_KEY, COSMOS_DB_NAME]):
     raise RuntimeError(
         "Missing one or more Cosmos env variables. "
@@ -24,11 +49,219 @@ if not all([COSMOS_URL, COSMOS_KEY, COSMOS_DB_NAME]):
 try:
     client = CosmosClient(COSMOS_URL, credential=COSMOS_KEY)
     database = client.get_database_client(COSMOS_DB_NAME)
-    container = database.get_container_client(COSMOS_CONTAINER_NAME)
+    # Partition key, política de indexado y TTL declarados en container_spec.json
+    container = database.create_container_if_not_exists(
+        id=COSMOS_CONTAINER_NAME,
+        partition_key=PartitionKey(path=CONTAINER_SPEC["partition_key"]),
+        indexing_policy=CONTAINER_SPEC["indexing_policy"],
+        default_ttl=CONTAINER_SPEC["default_ttl"],
+    )
 except exceptions.CosmosHttpResponseError as e:
     raise RuntimeError(f"Error connecting to Cosmos DB: {e}") from e
 
 
+# create_container_if_not_exists no cambia contenedores existentes: comprobamos la
+# política en vivo para que una diferencia no pase desapercibida.
+_policy_differences = diff_container_spec(container.read())
+if _policy_differences:
+    _message = (
+        f"Container '{COSMOS_CONTAINER_NAME}' differs from container_spec.json: "
+        + "; ".join(_policy_differences)
+        + ". Run 'python provisioning.py apply' from repairs_api to update it."
+    )
+    if STRICT_CONTAINER_POLICY:
+        raise RuntimeError(_message)
+    logger.warning(_message)
+
+
+# ---------- Diagnóstico de llamadas a Cosmos ----------
+
+
+def _last_headers() -> Dict[str, Any]:
+    """Cabeceras de la última respuesta de Cosmos (request charge, throttling...)."""
+    return container.client_connection.last_response_headers or {}
+
+
+def _log_if_slow(diag: Dict[str, Any]) -> None:
+    """Escribe una línea JSON en el slow-query log si la llamada superó el umbral."""
+    if diag["elapsed_ms"] >= SLOW_QUERY_THRESHOLD_MS:
+        slow_query_logger.warning(json.dumps(diag, default=str))
+
+
+def _add_response_diagnostics(diag: Dict[str, Any], headers: Dict[str, Any]) -> None:
+    """Acumula en diag el coste y los reintentos por throttling de una respuesta."""
+    diag["request_charge"] += float(headers.get("x-ms-request-charge", 0) or 0)
+    diag["throttle_retries"] += int(headers.get("x-ms-throttle-retry-count", 0) or 0)
+    diag["throttle_wait_ms"] += float(
+        headers.get("x-ms-throttle-retry-wait-time-ms", 0) or 0
+    )
+
+
+def _query_items(query: str, parameters: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Ejecuta query_items página a página capturando diagnóstico:
+    texto de la query con nombres de parámetros (sin valores), páginas,
+    RU consumidas, reintentos por throttling y tiempo total.
+    Solo una muestra de las queries pide las query metrics a Cosmos.
+    """
+    sample_metrics = random.random() < QUERY_METRICS_SAMPLE_RATE
+    diag: Dict[str, Any] = {
+        "operation": "query_items",
+        "query": " ".join(query.split()),
+        "parameters": [p["name"] for p in parameters],
+        "pages": 0,
+        "request_charge": 0.0,
+        "throttle_retries": 0,
+        "throttle_wait_ms": 0.0,
+    }
+    query_metrics: List[str] = []
+    items: List[Dict[str, Any]] = []
+
+    start = time.perf_counter()
+    try:
+        pager = container.query_items(
+            query=query,
+            parameters=parameters,
+            enable_cross_partition_query=True,
+            populate_query_metrics=sample_metrics,
+        ).by_page()
+        for page in pager:
+            items.extend(page)
+            headers = _last_headers()
+            diag["pages"] += 1
+            _add_response_diagnostics(diag, headers)
+            if sample_metrics and headers.get("x-ms-documentdb-query-metrics"):
+                query_metrics.append(headers["x-ms-documentdb-query-metrics"])
+    except exceptions.CosmosHttpResponseError:
+        # La página que falla (p. ej. 429 agotados) también cuenta en el diagnóstico
+        _add_response_diagnostics(diag, _last_headers())
+        raise
+    finally:
+        diag["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        diag["item_count"] = len(items)
+        if query_metrics:
+            diag["query_metrics"] = query_metrics
+        _log_if_slow(diag)
+    return items
+
+
+def _create_item(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Ejecuta create_item capturando RU, throttling y tiempo total."""
+    diag: Dict[str, Any] = {
+        "operation": "create_item",
+        "request_charge": 0.0,
+        "throttle_retries": 0,
+        "throttle_wait_ms": 0.0,
+    }
+
+    start = time.perf_counter()
+    try:
+        result = container.create_item(doc)
+    finally:
+        # También en errores (429 agotados, conflictos...): es cuando más interesa
+        diag["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        _add_response_diagnostics(diag, _last_headers())
+        _log_if_slow(diag)
+    return result
+
+
+def _patch_item(
+    repair_id: str, operations: List[Dict[str, Any]], etag: Optional[str]
+) -> Dict[str, Any]:
+    """
+    Ejecuta patch_item (actualización parcial en el servidor) capturando
+    RU, throttling y tiempo total. Si llega etag, la operación solo se aplica
+    si el documento no ha cambiado desde entonces.
+    """
+    diag: Dict[str, Any] = {
+        "operation": "patch_item",
+        "paths": [op["path"] for op in operations],
+        "conditional": etag is not None,
+        "request_charge": 0.0,
+        "throttle_retries": 0,
+        "throttle_wait_ms": 0.0,
+    }
+
+    kwargs: Dict[str, Any] = {}
+    if etag:
+        kwargs = {"etag": etag, "match_condition": MatchConditions.IfNotModified}
+
+    start = time.perf_counter()
+    try:
+        # La partition key del contenedor es /id
+        result = container.patch_item(
+            item=repair_id,
+            partition_key=repair_id,
+            patch_operations=operations,
+            **kwargs,
+        )
+    finally:
+        diag["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        _add_response_diagnostics(diag, _last_headers())
+        _log_if_slow(diag)
+    return result
+
+
+def _read_change_feed(
+    cursor: Optional[str], max_items: int
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Lee una página del change feed de Cosmos a partir de cursor
+    (o desde el principio si no hay cursor), capturando el mismo diagnóstico
+    que _query_items. Devuelve los documentos y el nuevo cursor.
+    """
+    diag: Dict[str, Any] = {
+        "operation": "query_items_change_feed",
+        "has_cursor": cursor is not None,
+        "pages": 0,
+        "request_charge": 0.0,
+        "throttle_retries": 0,
+        "throttle_wait_ms": 0.0,
+    }
+
+    items: List[Dict[str, Any]] = []
+
+    start = time.perf_counter()
+    try:
+        if cursor:
+            feed = container.query_items_change_feed(
+                continuation=cursor, max_item_count=max_items
+            )
+        else:
+            feed = container.query_items_change_feed(
+                start_time="Beginning", max_item_count=max_items
+            )
+        items.extend(next(feed.by_page(), []))
+        headers = _last_headers()
+        diag["pages"] = 1
+        _add_response_diagnostics(diag, headers)
+    except exceptions.CosmosHttpResponseError:
+        # La página que falla (p. ej. 429 agotados) también cuenta en el diagnóstico
+        _add_response_diagnostics(diag, _last_headers())
+        raise
+    finally:
+        diag["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        diag["item_count"] = len(items)
+        _log_if_slow(diag)
+    # El etag de la última respuesta es el continuation token del change feed
+    return items, headers.get("etag", cursor)
+
+
+def utc_timestamp(value: Optional[datetime] = None) -> str:
+    """
+    Formatea una fecha como timestamp UTC de ancho fijo: 2024-10-21T09:15:00.000000Z.
+
+    Todos los created_at se guardan con este formato para que las comparaciones
+    de texto en Cosmos (>=, <, ORDER BY) respeten el orden cronológico.
+    Las fechas sin zona horaria se interpretan como UTC.
+    """
+    if value is None:
+        value = datetime.now(timezone.utc)
+    elif value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
 def create_repair_in_db(
     item: str,
     description: str,
@@ -37,18 +270,19 @@ def create_repair_in_db(
     created_by: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
-    Inserta un ticket de reparación en Cosmos DB y devuelve el documento como dict.
+    Inserta un ticket de reparación en Cosmos DB y devuelve el documento guardado
+    por Cosmos (incluye _etag, necesario para un PATCH con If-Match).
 
     Campos:
     - id: GUID generado por la API
     - item, description, status, assigned_to: datos funcionales
-    - created_at: timestamp UTC ISO-8601
+    - created_at: timestamp UTC ISO-8601 (ver utc_timestamp)
     - created_by: identificador de quién crea el ticket (tenant|conversation, etc.)
     """
     from uuid import uuid4
 
     repair_id = str(uuid4())
-    created_at = datetime.now(timezone.utc).isoformat()
+    created_at = utc_timestamp()
 
     doc: Dict[str, Any] = {
         "id": repair_id,
@@ -59,15 +293,63 @@ def create_repair_in_db(
         "created_at": created_at,
         "created_by": created_by,
     }
+    if status in CLOSED_STATUSES:
+        doc["ttl"] = CLOSED_TICKET_TTL_SECONDS
+
+    return _create_item(doc)
+
+
+UPDATABLE_FIELDS = {"status", "assigned_to"}
+
+ORDER_DIRECTIONS = {
+    "created_at_desc": "DESC",
+    "created_at_asc": "ASC",
+}
+
+
+def _filter_clause(
+    status: Optional[str] = None,
+    assigned_to: Optional[str] = None,
+    created_by: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Tuple[str, List[Dict[str, Any]]]:
+    """Construye el WHERE (y sus parámetros) común a las consultas de listado."""
+    where = " WHERE 1 = 1"
+    parameters: List[Dict[str, Any]] = []
+
+    if status:
+        where += " AND c.status = @status"
+        parameters.append({"name": "@status", "value": status})
+
+    if assigned_to:
+        # CONTAINS, case-insensitive (tercer parámetro = true)
+        where += " AND IS_DEFINED(c.assigned_to) " \
+                 "AND CONTAINS(c.assigned_to, @assigned_to, true)"
+        parameters.append({"name": "@assigned_to", "value": assigned_to})
+
+    if created_by:
+        where += " AND c.created_by = @created_by"
+        parameters.append({"name": "@created_by", "value": created_by})
 
-    container.create_item(doc)
-    return doc
+    if since:
+        where += " AND c.created_at >= @since"
+        parameters.append({"name": "@since", "value": utc_timestamp(since)})
+
+    if until:
+        where += " AND c.created_at < @until"
+        parameters.append({"name": "@until", "value": utc_timestamp(until)})
+
+    return where, parameters
 
 
 def list_repairs_from_db(
     status: Optional[str] = None,
     assigned_to: Optional[str] = None,
     created_by: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    order: Optional[str] = None,
 ) -> List[Dict[str, Any]]:
     """
     Devuelve una lista de tickets desde Cosmos DB, con filtros opcionales:
@@ -75,39 +357,131 @@ def list_repairs_from_db(
     - status: filtra por estado exacto (New, In Progress, Completed, etc.)
     - assigned_to: hace un CONTAINS sobre el campo assigned_to (case-insensitive).
     - created_by: filtra por el identificador guardado (tenant o tenant|conversation).
+    - since / until: rango sobre created_at (since incluido, until excluido).
+    - order: "created_at_desc" o "created_at_asc"; se resuelve con ORDER BY en Cosmos.
     """
+    if order is not None and order not in ORDER_DIRECTIONS:
+        raise ValueError(f"Unsupported order: {order}")
+
+    where, parameters = _filter_clause(status, assigned_to, created_by, since, until)
     query = """
         SELECT c.id, c.item, c.description, c.status,
-               c.assigned_to, c.created_at, c.created_by
+               c.assigned_to, c.created_at, c.created_by, c.updated_at, c._etag
         FROM c
-        WHERE 1 = 1
+    """ + where
+
+    if order:
+        # ORDER BY simple: lo sirve el índice de rango de created_at. Los índices
+        # compuestos (status|created_by, created_at) son solo una optimización.
+        query += f" ORDER BY c.created_at {ORDER_DIRECTIONS[order]}"
+
+    # items ya es una lista de dicts
+    return _query_items(query, parameters)
+
+
+def summarize_repairs_from_db(
+    status: Optional[str] = None,
+    assigned_to: Optional[str] = None,
+    created_by: Optional[str] = None,
+    top: int = 10,
+    description_chars: int = 80,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     """
-    parameters: List[Dict[str, Any]] = []
+    Vista resumida resuelta en Cosmos DB con dos consultas acotadas:
 
-    if status:
-        query += " AND c.status = @status"
-        parameters.append({"name": "@status", "value": status})
+    - totales por estado: SELECT VALUE c.status contado en Python. El SDK de Python
+      no admite GROUP BY entre particiones (la partition key es /id), y solo viaja
+      el estado de cada ticket, no el documento,
+    - los top tickets más recientes (SELECT TOP ... ORDER BY created_at DESC),
+      con la descripción recortada en el servidor a description_chars + 1
+      caracteres (el carácter extra permite saber si se ha recortado).
 
-    if assigned_to:
-        # CONTAINS, case-insensitive (tercer parámetro = true)
-        query += " AND IS_DEFINED(c.assigned_to) " \
-                 "AND CONTAINS(c.assigned_to, @assigned_to, true)"
-        parameters.append({"name": "@assigned_to", "value": assigned_to})
+    Devuelve (counts, rows): counts es [{"status": ..., "count": ...}].
+    """
+    where, parameters = _filter_clause(status, assigned_to, created_by)
 
-    if created_by:
-        query += " AND c.created_by = @created_by"
-        parameters.append({"name": "@created_by", "value": created_by})
+    statuses = Counter(_query_items("SELECT VALUE c.status FROM c" + where, parameters))
+    counts = [{"status": name, "count": count} for name, count in statuses.items()]
 
-    items = list(
-        container.query_items(
-            query=query,
-            parameters=parameters,
-            enable_cross_partition_query=True,
-        )
+    rows = _query_items(
+        """
+        SELECT TOP @top c.id, c.item,
+               LEFT(c.description, @description_chars) AS description,
+               c.status, c.assigned_to, c.created_at
+        FROM c
+        """ + where + " ORDER BY c.created_at DESC",
+        parameters + [
+            {"name": "@top", "value": top},
+            {"name": "@description_chars", "value": description_chars + 1},
+        ],
     )
+    return counts, rows
 
-    # items ya es una lista de dicts
-    return items
+
+class RepairConflictError(Exception):
+    """El ticket ha cambiado desde el ETag que envió el cliente."""
+
+
+def update_repair_in_db(
+    repair_id: str,
+    fields: Dict[str, Any],
+    etag: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Actualiza parcialmente un ticket con patch_item, sin leer el documento antes.
+
+    - fields: campos a cambiar (solo status y/o assigned_to); además se fija updated_at
+      y, si cambia el estado, el ttl (caduca al cerrarse, -1 si se reabre).
+    - etag: si se indica, concurrencia optimista (If-Match) sobre el documento.
+
+    Devuelve el documento actualizado (incluye _etag) o None si no existe.
+    Lanza RepairConflictError si el ETag no coincide.
+    """
+    unknown = set(fields) - UPDATABLE_FIELDS
+    if unknown:
+        raise ValueError(f"Fields cannot be updated: {', '.join(sorted(unknown))}")
+
+    operations = [
+        {"op": "set", "path": f"/{name}", "value": value}
+        for name, value in fields.items()
+    ]
+    operations.append({"op": "set", "path": "/updated_at", "value": utc_timestamp()})
+    if "status" in fields:
+        ttl = CLOSED_TICKET_TTL_SECONDS if fields["status"] in CLOSED_STATUSES else -1
+        operations.append({"op": "set", "path": "/ttl", "value": ttl})
+
+    try:
+        return _patch_item(repair_id, operations, etag)
+    except exceptions.CosmosResourceNotFoundError:
+        return None
+    except exceptions.CosmosAccessConditionFailedError as e:
+        raise RepairConflictError(
+            f"Repair {repair_id} was modified by someone else."
+        ) from e
+
+
+def list_repair_changes_from_db(
+    cursor: Optional[str] = None,
+    max_items: int = 100,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Devuelve los tickets creados o modificados desde cursor usando el change feed.
+
+    - cursor: valor devuelto por la llamada anterior; None para empezar desde el principio.
+    - max_items: tamaño máximo de la página.
+
+    Devuelve (documentos, nuevo_cursor). Cada documento aparece en su última versión.
+    Lanza ValueError si el cursor no es válido.
+    """
+    try:
+        return _read_change_feed(cursor, max_items)
+    except exceptions.CosmosHttpResponseError as e:
+        if e.status_code == 400:
+            raise ValueError("Invalid change feed cursor.") from e
+        raise
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        # Un cursor en base64 válido pero con otra forma falla al parsearlo el SDK
+        raise ValueError("Invalid change feed cursor.") from e
 
 
 if __name__ == "__main__":
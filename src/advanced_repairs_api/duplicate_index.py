@@ -0,0 +1,132 @@
+"""duplicate_index.py - Detección de tickets casi duplicados con MinHash + LSH.
+
+Cada ticket abierto se resume en una firma MinHash de las palabras de
+item + description. Las firmas se reparten en bandas (LSH), de modo que
+buscar duplicados solo compara con los tickets que comparten alguna banda
+en el mismo tenant, en lugar de recorrer todos los tickets.
+"""
+import random
+import threading
+import zlib
+from typing import Any, Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from search_index import SNAPSHOT_FIELDS, tenant_of, tokenize
+
+# 64 permutaciones en 16 bandas de 4 filas: umbral LSH aprox. (1/16)^(1/4) ≈ 0.5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Similitud de Jaccard mínima para considerar un ticket como posible duplicado
+DUPLICATE_THRESHOLD = 0.5
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Coeficientes fijos (semilla fija) para que las firmas sean estables entre ejecuciones
+_rng = random.Random(4165033)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def shingles(item: str, description: str) -> FrozenSet[str]:
+    """Conjunto de palabras normalizadas de item + description."""
+    return frozenset(tokenize(f"{item or ''} {description or ''}"))
+
+
+def minhash(tokens: Iterable[str]) -> Tuple[int, ...]:
+    """Firma MinHash de un conjunto de palabras."""
+    hashes = [zlib.crc32(token.encode("utf-8")) for token in tokens]
+    if not hashes:
+        return tuple([_MAX_HASH] * NUM_PERM)
+    return tuple(
+        min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Similitud de Jaccard entre dos conjuntos."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class RepairDuplicateIndex:
+    """Índice LSH de tickets abiertos, con las claves separadas por tenant."""
+
+    def __init__(self, closed_statuses: Iterable[str]) -> None:
+        self._closed_statuses = set(closed_statuses)
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[str, int, Tuple[int, ...]], Set[str]] = {}
+        self._keys: Dict[str, List[Tuple[str, int, Tuple[int, ...]]]] = {}
+        self._shingles: Dict[str, FrozenSet[str]] = {}
+        self._docs: Dict[str, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    @staticmethod
+    def _band_keys(tenant: str, signature: Tuple[int, ...]) -> List[Tuple[str, int, Tuple[int, ...]]]:
+        return [
+            (tenant, band, signature[band * ROWS:(band + 1) * ROWS])
+            for band in range(BANDS)
+        ]
+
+    def _remove_locked(self, repair_id: str) -> None:
+        for key in self._keys.pop(repair_id, []):
+            bucket = self._buckets[key]
+            bucket.discard(repair_id)
+            if not bucket:
+                del self._buckets[key]
+        self._shingles.pop(repair_id, None)
+        self._docs.pop(repair_id, None)
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        """Añade o reemplaza un ticket; si está cerrado, lo quita del índice."""
+        repair_id = doc["id"]
+        if doc.get("status") in self._closed_statuses:
+            self.remove(repair_id)
+            return
+
+        tokens = shingles(doc.get("item"), doc.get("description"))
+        keys = self._band_keys(tenant_of(doc.get("created_by")), minhash(tokens))
+
+        with self._lock:
+            self._remove_locked(repair_id)
+            for key in keys:
+                self._buckets.setdefault(key, set()).add(repair_id)
+            self._keys[repair_id] = keys
+            self._shingles[repair_id] = tokens
+            self._docs[repair_id] = {field: doc.get(field) for field in SNAPSHOT_FIELDS}
+
+    def remove(self, repair_id: str) -> None:
+        """Quita un ticket del índice (no falla si no existe)."""
+        with self._lock:
+            self._remove_locked(repair_id)
+
+    def find_duplicates(
+        self, item: str, description: str, tenant: str, limit: int = 3
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Devuelve [(similitud, ticket)] de los tickets abiertos de tenant
+        que se parecen a item + description, los más parecidos primero.
+        """
+        tokens = shingles(item, description)
+        if not tokens:
+            return []
+        keys = self._band_keys(tenant, minhash(tokens))
+
+        with self._lock:
+            candidates: Set[str] = set()
+            for key in keys:
+                candidates.update(self._buckets.get(key, ()))
+
+            # Los candidatos de LSH se confirman con la similitud exacta
+            matches = []
+            for repair_id in candidates:
+                similarity = jaccard(tokens, self._shingles[repair_id])
+                if similarity >= DUPLICATE_THRESHOLD:
+                    matches.append((round(similarity, 3), dict(self._docs[repair_id])))
+
+        matches.sort(key=lambda match: match[0], reverse=True)
+        return matches[:limit]
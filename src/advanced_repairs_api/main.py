@@ -1,19 +1,93 @@
 """Repair Service API (FastAPI + Cosmos DB)."""
+import asyncio
+import logging
 import os
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime
 from dotenv import load_dotenv
-from typing import List, Optional
+from typing import List, Literal, Optional
+
+from fastapi import FastAPI, Query, Request, Response, Depends, Header, HTTPException, status
+from pydantic import AliasChoices, BaseModel, Field
+
+from change_feed import ChangeFeedFollower
+from database import (
+    CLOSED_STATUSES,
+    RepairConflictError,
+    create_repair_in_db,
+    list_repair_changes_from_db,
+    list_repairs_from_db,
+    summarize_repairs_from_db,
+    update_repair_in_db,
+)
+from duplicate_index import RepairDuplicateIndex
+from search_index import MAX_RESULTS, RepairSearchIndex, tenant_of
+
+# Índices en memoria (búsqueda de texto y posibles duplicados); se mantienen con
+# las escrituras de esta instancia y se ponen al día con el change feed en
+# segundo plano (cambios hechos por otras réplicas, ver refresh_indexes).
+repair_index = RepairSearchIndex()
+duplicate_index = RepairDuplicateIndex(closed_statuses=CLOSED_STATUSES)
+index_follower = ChangeFeedFollower(
+    list_repair_changes_from_db,
+    consumers=[repair_index.add, duplicate_index.add],
+)
+SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "5"))
+
+logger = logging.getLogger("repairs_api")
+
+# uvicorn solo configura sus propios loggers: sin handler propio los INFO de
+# repairs_api (y sus hijos, como repairs_api.slow_query) se pierden.
+if not logger.handlers:
+    _log_handler = logging.StreamHandler()
+    _log_handler.setFormatter(logging.Formatter("%(levelname)s:     %(name)s - %(message)s"))
+    logger.addHandler(_log_handler)
+    logger.setLevel(logging.INFO)
+
+
+def index_repair(doc: dict) -> None:
+    """Actualiza los índices en memoria tras una escritura en Cosmos DB."""
+    repair_index.add(doc)
+    duplicate_index.add(doc)
+
 
-from fastapi import FastAPI, Query, Request, Depends, Header, HTTPException, status
-from pydantic import BaseModel, Field
+async def refresh_indexes() -> None:
+    """
+    Aplica el change feed a los índices cada SEARCH_INDEX_REFRESH_SECONDS.
+    La lectura (una o más llamadas a Cosmos) va en un hilo aparte para no bloquear
+    el event loop: búsquedas y duplicados solo consultan los índices en memoria.
+    """
+    while True:
+        await asyncio.sleep(SEARCH_INDEX_REFRESH_SECONDS)
+        try:
+            await asyncio.to_thread(index_follower.catch_up)
+        except Exception:
+            # Un fallo puntual (429, red...) no debe parar el refresco
+            logger.exception("Change feed refresh failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Construye los índices en memoria desde Cosmos DB al arrancar y los mantiene al día."""
+    await asyncio.to_thread(index_follower.catch_up)
+    logger.info(
+        "Indexes built: %d repairs searchable, %d open repairs for duplicate detection",
+        len(repair_index),
+        len(duplicate_index),
+    )
+    refresher = asyncio.create_task(refresh_indexes())
+    yield
+    refresher.cancel()
+    with suppress(asyncio.CancelledError):
+        await refresher
 
-from database import create_repair_in_db, list_repairs_from_db
 
 app = FastAPI(
     title="Repair Service",
     description="A simple service to manage repair tickets for devices on behalf of users.",
     version="1.0.0",
     openapi_url="/openapi.json",
+    lifespan=lifespan,
 )
 
 # --- API Key auth (para el API plugin de Copilot) ---
@@ -102,6 +176,16 @@ class Repair(RepairBase):
         None,
         description="Identifier of who created this ticket (tenant ID and/or conversation ID).",
     )
+    updated_at: Optional[datetime] = Field(
+        None,
+        description="Date and time of the last update of the ticket (UTC), if any.",
+    )
+    # Cosmos DB lo devuelve como _etag; FastAPI revalida la respuesta ya como etag
+    etag: Optional[str] = Field(
+        None,
+        validation_alias=AliasChoices("etag", "_etag"),
+        description="ETag of the ticket. Send it in the If-Match header of updateRepair.",
+    )
 
 
 class RepairCreate(RepairBase):
@@ -109,6 +193,226 @@ class RepairCreate(RepairBase):
     # deliberately no created_by here; we compute it on the server side
 
 
+class RepairUpdate(BaseModel):
+    """Payload for a partial update of a repair ticket. Only the fields sent are changed."""
+    status: Optional[str] = Field(
+        None,
+        description="New status of the repair, such as 'In Progress' or 'Completed'.",
+    )
+    assigned_to: Optional[str] = Field(
+        None,
+        description="Name of the person or team to assign this repair to.",
+    )
+
+
+class RepairSummaryItem(BaseModel):
+    """Compact view of a repair ticket, with a truncated description."""
+    id: str = Field(
+        ...,
+        description="Unique identifier of the repair ticket.",
+    )
+    item: str = Field(
+        ...,
+        description="Name or type of the item that needs repair.",
+    )
+    description: str = Field(
+        ...,
+        description="Description of the issue, truncated to a few characters.",
+    )
+    status: str = Field(
+        ...,
+        description="Current status of the repair.",
+    )
+    assigned_to: Optional[str] = Field(
+        None,
+        description="Name of the person or team that this repair is assigned to.",
+    )
+    created_at: datetime = Field(
+        ...,
+        description="Date and time when the repair ticket was created (UTC).",
+    )
+
+
+class StatusCount(BaseModel):
+    """Number of repairs in a given status."""
+    status: str = Field(
+        ...,
+        description="Status of the repairs, such as 'New' or 'Completed'.",
+    )
+    count: int = Field(
+        ...,
+        description="Number of matching repairs in this status.",
+    )
+
+
+class RepairSummary(BaseModel):
+    """Summary view of the repairs list: totals plus the newest N tickets."""
+    total: int = Field(
+        ...,
+        description="Total number of repairs matching the filters.",
+    )
+    counts_by_status: List[StatusCount] = Field(
+        ...,
+        description="Number of matching repairs per status, most frequent first.",
+    )
+    returned: int = Field(
+        ...,
+        description="Number of repairs included in 'repairs'.",
+    )
+    repairs: List[RepairSummaryItem] = Field(
+        ...,
+        description="Newest repairs first, capped to 'top' items.",
+    )
+
+
+class RepairChanges(BaseModel):
+    """A page of repairs created or modified since a cursor."""
+    changes: List[Repair] = Field(
+        ...,
+        description="Repairs created or modified since the cursor, in their latest version.",
+    )
+    cursor: Optional[str] = Field(
+        None,
+        description="Cursor to send in the next call to get only newer changes.",
+    )
+    has_more: bool = Field(
+        ...,
+        description=(
+            "True while the page had changes. Keep calling with the new cursor until "
+            "a page comes back empty (has_more false): a short page does not mean "
+            "the feed is drained."
+        ),
+    )
+
+
+class RepairSearchHit(RepairSummaryItem):
+    """A repair returned by the text search, with its relevance score."""
+    score: float = Field(
+        ...,
+        description="BM25 relevance score; higher means more relevant.",
+    )
+
+
+class RepairSearchResults(BaseModel):
+    """Result of a text search over repair tickets."""
+    query: str = Field(
+        ...,
+        description="The search text that was used.",
+    )
+    total: int = Field(
+        ...,
+        description="Total number of repairs matching the search.",
+    )
+    returned: int = Field(
+        ...,
+        description="Number of repairs included in 'repairs'.",
+    )
+    repairs: List[RepairSearchHit] = Field(
+        ...,
+        description="Most relevant repairs first, capped to 'limit' items.",
+    )
+
+
+class RepairDuplicate(RepairSummaryItem):
+    """An open repair that looks like a duplicate of the new one."""
+    similarity: float = Field(
+        ...,
+        description="Estimated word similarity with the new repair, from 0 to 1.",
+    )
+
+
+class RepairCreated(Repair):
+    """A newly created repair ticket, plus likely duplicates if they were checked."""
+    possible_duplicates: List[RepairDuplicate] = Field(
+        default_factory=list,
+        description="Open repairs of the same tenant that look like the same issue.",
+    )
+
+
+# ---------- Helpers ----------
+
+CHANGES_MAX_LIMIT = 500
+
+SUMMARY_MAX_TOP = 50
+SUMMARY_DESCRIPTION_CHARS = 80
+
+
+def created_by_from_headers(headers) -> str:
+    """
+    Construye el identificador de quién hace la petición a partir de las
+    cabeceras de contexto de Microsoft 365 Copilot:
+    - x-microsoft-tenantid
+    - x-microsoft-ai-conversationid
+    """
+    tenant_id = headers.get("x-microsoft-tenantid")
+    conversation_id = headers.get("x-microsoft-ai-conversationid")
+
+    if tenant_id and conversation_id:
+        return f"{tenant_id}|{conversation_id}"
+    if tenant_id:
+        return tenant_id
+    return "unknown"  # útil en pruebas locales o llamadas directas sin Copilot
+
+
+def to_duplicates(matches: List[tuple]) -> List[RepairDuplicate]:
+    """Convierte los resultados de duplicate_index en modelos de respuesta."""
+    return [
+        RepairDuplicate(
+            id=doc["id"],
+            item=doc["item"],
+            description=truncate_text(doc.get("description") or "", SUMMARY_DESCRIPTION_CHARS),
+            status=doc["status"],
+            assigned_to=doc.get("assigned_to"),
+            created_at=doc["created_at"],
+            similarity=similarity,
+        )
+        for similarity, doc in matches
+    ]
+
+
+def truncate_text(text: str, max_chars: int) -> str:
+    """Recorta un texto a max_chars caracteres añadiendo '…' si se ha cortado."""
+    if len(text) <= max_chars:
+        return text
+    return text[: max_chars - 1].rstrip() + "…"
+
+
+def summarize_repairs(
+    counts: List[dict], rows: List[dict], description_chars: int
+) -> RepairSummary:
+    """
+    Construye la vista resumida a partir de summarize_repairs_from_db:
+    totales por estado y los tickets más recientes (TOP ... ORDER BY).
+    """
+    counts_by_status = sorted(
+        (
+            StatusCount(status=row.get("status") or "Unknown", count=row["count"])
+            for row in counts
+        ),
+        key=lambda status_count: status_count.count,
+        reverse=True,
+    )
+
+    repairs = [
+        RepairSummaryItem(
+            id=row["id"],
+            item=row["item"],
+            description=truncate_text(row.get("description") or "", description_chars),
+            status=row["status"],
+            assigned_to=row.get("assigned_to"),
+            created_at=row["created_at"],
+        )
+        for row in rows
+    ]
+
+    return RepairSummary(
+        total=sum(status_count.count for status_count in counts_by_status),
+        counts_by_status=counts_by_status,
+        returned=len(repairs),
+        repairs=repairs,
+    )
+
+
 # ---------- Endpoints ----------
 
 
@@ -119,7 +423,8 @@ class RepairCreate(RepairBase):
     summary="List all repairs",
     description=(
         "Returns a list of repair tickets with their details. "
-        "You can optionally filter by status, assigned_to, or created_by."
+        "You can optionally filter by status, assigned_to, created_by, "
+        "or by creation date (since/until), and sort by creation date."
     ),
     dependencies=[Depends(verify_api_key)],
 )
@@ -139,50 +444,238 @@ async def list_repairs(
             "(for example the tenant ID or tenant|conversation)."
         ),
     ),
+    since: Optional[datetime] = Query(
+        None,
+        description="Only repairs created at or after this date and time (UTC if no offset).",
+    ),
+    until: Optional[datetime] = Query(
+        None,
+        description="Only repairs created before this date and time (UTC if no offset).",
+    ),
+    order: Optional[Literal["created_at_desc", "created_at_asc"]] = Query(
+        None,
+        description="Optional sort order. Use 'created_at_desc' to get the latest repairs first.",
+    ),
 ) -> List[Repair]:
     """
-    List all repairs, optionally filtered by status, assigned_to and created_by.
-    Data is retrieved from Azure Cosmos DB.
+    List all repairs, optionally filtered by status, assigned_to, created_by
+    and a created_at range, optionally sorted by created_at.
+    Data is retrieved from Azure Cosmos DB (filters and ORDER BY run server-side).
     """
     rows = list_repairs_from_db(
         status=status,
         assigned_to=assigned_to,
         created_by=created_by,
+        since=since,
+        until=until,
+        order=order,
     )
 
     # Pydantic se encarga de convertir created_at (string ISO) a datetime
     return [Repair(**row) for row in rows]
 
 
+@app.get(
+    "/repairs/summary",
+    response_model=RepairSummary,
+    operation_id="listRepairsSummary",
+    summary="List repairs (summary view)",
+    description=(
+        "Returns a compact summary of repair tickets: total counts per status and "
+        "the newest repairs with truncated descriptions. Prefer this operation to "
+        "answer general questions about repairs. "
+        "You can optionally filter by status, assigned_to, or created_by."
+    ),
+    dependencies=[Depends(verify_api_key)],
+)
+async def list_repairs_summary(
+    status: Optional[str] = Query(
+        None,
+        description="Optional status to filter repairs by. Example: 'New' or 'Completed'.",
+    ),
+    assigned_to: Optional[str] = Query(
+        None,
+        description="Optional name or ID of the person or team the repair is assigned to.",
+    ),
+    created_by: Optional[str] = Query(
+        None,
+        description=(
+            "Optional identifier of who created the ticket "
+            "(for example the tenant ID or tenant|conversation)."
+        ),
+    ),
+    top: int = Query(
+        10,
+        ge=1,
+        le=SUMMARY_MAX_TOP,
+        description="Maximum number of repairs to return, newest first.",
+    ),
+) -> RepairSummary:
+    """
+    Summary view of the repairs list (view=summary).
+    Same filters as listRepairs, but Cosmos DB only returns the counts per status
+    and the top N rows with short descriptions, so it costs far fewer RU and bytes.
+    """
+    counts, rows = summarize_repairs_from_db(
+        status=status,
+        assigned_to=assigned_to,
+        created_by=created_by,
+        top=top,
+        description_chars=SUMMARY_DESCRIPTION_CHARS,
+    )
+
+    return summarize_repairs(counts, rows, description_chars=SUMMARY_DESCRIPTION_CHARS)
+
+
+@app.get(
+    "/repairs/changes",
+    response_model=RepairChanges,
+    operation_id="listRepairChanges",
+    summary="List repair changes since a cursor",
+    description=(
+        "Returns only the repairs created or modified since the given cursor, "
+        "in bounded pages, plus a new cursor. Call it without cursor for the "
+        "initial sync and then keep sending the returned cursor until a page "
+        "comes back empty. Closed tickets are deleted by Cosmos DB "
+        "CLOSED_TICKET_TTL_SECONDS (90 days by default) after their last update, "
+        "and those deletions do not appear in the change feed: mirrors must drop "
+        "closed tickets older than that themselves."
+    ),
+    dependencies=[Depends(verify_api_key)],
+)
+async def list_repair_changes(
+    cursor: Optional[str] = Query(
+        None,
+        description="Cursor returned by the previous call. Omit it to start from the beginning.",
+    ),
+    limit: int = Query(
+        100,
+        ge=1,
+        le=CHANGES_MAX_LIMIT,
+        description="Maximum number of changes to return in this page.",
+    ),
+) -> RepairChanges:
+    """
+    Delta sync for downstream systems, backed by the Cosmos DB change feed.
+    Consumers only pay for the documents that changed since their cursor.
+    """
+    try:
+        rows, next_cursor = list_repair_changes_from_db(cursor=cursor, max_items=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+
+    return RepairChanges(
+        changes=[Repair(**row) for row in rows],
+        cursor=next_cursor,
+        # Una página corta no implica que no queden cambios (el change feed
+        # devuelve un rango de particiones cada vez): solo una página vacía lo garantiza.
+        has_more=bool(rows),
+    )
+
+
+@app.get(
+    "/repairs/search",
+    response_model=RepairSearchResults,
+    operation_id="searchRepairs",
+    summary="Search repairs by text",
+    description=(
+        "Full-text search over the item and description of the repair tickets of "
+        "the current tenant, most relevant first. Use it for questions like "
+        "'any other tickets about flickering screens?'."
+    ),
+    dependencies=[Depends(verify_api_key)],
+)
+async def search_repairs(
+    request: Request,
+    q: str = Query(
+        ...,
+        min_length=1,
+        max_length=200,
+        description="Words to search for in the item and description of the repairs.",
+    ),
+    limit: int = Query(
+        10,
+        ge=1,
+        le=MAX_RESULTS,
+        description="Maximum number of repairs to return, most relevant first.",
+    ),
+) -> RepairSearchResults:
+    """
+    Search repairs with the in-memory BM25 index, scoped to the caller's tenant
+    (first part of created_by, taken from the Copilot headers).
+    The index is refreshed from the change feed in the background (see refresh_indexes).
+    """
+    tenant = tenant_of(created_by_from_headers(request.headers))
+    total, hits = repair_index.search(q, tenant=tenant, limit=limit)
+
+    repairs = [
+        RepairSearchHit(
+            id=doc["id"],
+            item=doc["item"],
+            description=truncate_text(doc.get("description") or "", SUMMARY_DESCRIPTION_CHARS),
+            status=doc["status"],
+            assigned_to=doc.get("assigned_to"),
+            created_at=doc["created_at"],
+            score=score,
+        )
+        for score, doc in hits
+    ]
+    return RepairSearchResults(query=q, total=total, returned=len(repairs), repairs=repairs)
+
+
 @app.post(
     "/repairs",
-    response_model=Repair,
+    response_model=RepairCreated,
     status_code=201,
     operation_id="createRepair",
     summary="Create a new repair",
-    description="Create a new repair ticket for a device that needs to be fixed.",
+    description=(
+        "Create a new repair ticket for a device that needs to be fixed. "
+        "Optionally checks for open tickets that look like the same issue."
+    ),
     dependencies=[Depends(verify_api_key)],
 )
-async def create_repair(payload: RepairCreate, request: Request) -> Repair:
+async def create_repair(
+    payload: RepairCreate,
+    request: Request,
+    response: Response,
+    duplicate_check: Literal["off", "warn", "reject"] = Query(
+        "off",
+        description=(
+            "Duplicate detection: 'off' (default), 'warn' creates the ticket and returns "
+            "likely duplicates, 'reject' does not create it if duplicates are found (409)."
+        ),
+    ),
+) -> RepairCreated:
     """
     Create a new repair ticket.
 
     Enriches the ticket with 'created_by' using Microsoft 365 Copilot context headers:
     - x-microsoft-tenantid
     - x-microsoft-ai-conversationid
-    """
-    headers = request.headers
-
-    tenant_id = headers.get("x-microsoft-tenantid")
-    conversation_id = headers.get("x-microsoft-ai-conversationid")
 
+    The ETag of the new ticket is returned in the etag field and the ETag header.
+    """
     # Construimos un identificador simple de quién creó el ticket
-    if tenant_id and conversation_id:
-        created_by = f"{tenant_id}|{conversation_id}"
-    elif tenant_id:
-        created_by = tenant_id
-    else:
-        created_by = "unknown"  # útil en pruebas locales o llamadas directas sin Copilot
+    created_by = created_by_from_headers(request.headers)
+
+    # Comprobación opcional de duplicados entre los tickets abiertos del tenant
+    duplicates: List[RepairDuplicate] = []
+    if duplicate_check != "off":
+        # Solo memoria: el índice se refresca en segundo plano (refresh_indexes)
+        duplicates = to_duplicates(
+            duplicate_index.find_duplicates(
+                payload.item, payload.description, tenant=tenant_of(created_by)
+            )
+        )
+        if duplicates and duplicate_check == "reject":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={
+                    "message": "Likely duplicate of an open repair.",
+                    "possible_duplicates": [d.model_dump(mode="json") for d in duplicates],
+                },
+            )
 
     # Guardar en Cosmos DB
     data = create_repair_in_db(
@@ -192,6 +685,69 @@ async def create_repair(payload: RepairCreate, request: Request) -> Repair:
         assigned_to=payload.assigned_to,
         created_by=created_by,
     )
+    index_repair(data)
 
+    if data.get("_etag"):
+        response.headers["ETag"] = data["_etag"]
     # Devolver el modelo completo a Copilot
+    return RepairCreated(**data, possible_duplicates=duplicates)
+
+
+@app.patch(
+    "/repairs/{repair_id}",
+    response_model=Repair,
+    operation_id="updateRepair",
+    summary="Update a repair",
+    description=(
+        "Update the status and/or the assignee of an existing repair ticket. "
+        "Only the fields sent in the body are changed."
+    ),
+    dependencies=[Depends(verify_api_key)],
+)
+async def update_repair(
+    repair_id: str,
+    payload: RepairUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(
+        None,
+        description=(
+            "Optional ETag of the ticket (the etag field returned by listRepairs or "
+            "createRepair); the update fails with 412 if it changed."
+        ),
+    ),
+) -> Repair:
+    """
+    Partial update of a repair ticket using Cosmos DB patch (no read-modify-replace).
+    The new ETag is returned in the ETag response header.
+    """
+    fields = payload.model_dump(include=payload.model_fields_set)
+    if not fields:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Send at least one of: status, assigned_to.",
+        )
+    if "status" in fields and fields["status"] is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="status cannot be null.",
+        )
+
+    try:
+        data = update_repair_in_db(repair_id, fields, etag=if_match)
+    except RepairConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=str(e),
+        ) from e
+
+    if data is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Repair {repair_id} not found.",
+        )
+
+    index_repair(data)
+
+    if data.get("_etag"):
+        response.headers["ETag"] = data["_etag"]
     return Repair(**data)
@@ -0,0 +1,167 @@
+"""search_index.py - Índice invertido en memoria para buscar tickets por texto.
+
+Indexa item + description de cada ticket y ordena los resultados con BM25.
+El índice se mantiene de forma incremental con add (tras cada escritura y con
+el change feed, ver change_feed.py). Los tickets cerrados con ttl se expulsan
+del índice cuando Cosmos DB los borra (_ts + ttl), aunque el change feed no
+informe del borrado.
+"""
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from math import log
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Parámetros estándar de BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Límites para que una búsqueda tenga un coste acotado
+MAX_QUERY_TERMS = 16
+MAX_RESULTS = 25
+
+# Campos del ticket que guardamos para devolver resultados sin ir a Cosmos
+SNAPSHOT_FIELDS = ("id", "item", "description", "status", "assigned_to", "created_at", "created_by")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "the", "to", "with", "any", "other", "about",
+    "de", "del", "el", "en", "la", "las", "los", "por", "que", "un", "una", "y", "con",
+}
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Minúsculas, sin acentos, sin stopwords y con un stemming mínimo
+    (quita la 's' final) para que 'screens' encuentre 'screen'.
+    """
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+
+    tokens = []
+    for token in _TOKEN_RE.findall(normalized):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def tenant_of(created_by: Optional[str]) -> str:
+    """El tenant es la primera parte de created_by (tenant|conversation)."""
+    return (created_by or "unknown").split("|", 1)[0]
+
+
+class RepairSearchIndex:
+    """Índice invertido BM25 sobre item + description, con scope por tenant."""
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Dict[str, int]] = {}
+        self._doc_len: Dict[str, int] = {}
+        self._total_len = 0
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        # Caducidad (epoch) de los tickets con ttl y un heap para expulsarlos en orden
+        self._expires_at: Dict[str, float] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _remove_locked(self, repair_id: str) -> None:
+        terms = self._doc_terms.pop(repair_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[repair_id]
+            if not postings:
+                del self._postings[term]
+        self._total_len -= self._doc_len.pop(repair_id)
+        del self._docs[repair_id]
+        self._expires_at.pop(repair_id, None)
+
+    def _evict_expired_locked(self, now: float) -> None:
+        """Quita los tickets cuyo ttl ya ha vencido (Cosmos DB ya los ha borrado)."""
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, repair_id = heapq.heappop(self._expiry_heap)
+            # Entradas obsoletas del heap (ticket reabierto o re-indexado) se ignoran
+            if self._expires_at.get(repair_id) == expires_at:
+                self._remove_locked(repair_id)
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        """
+        Añade o reemplaza un ticket en el índice. Si tiene ttl > 0 (ticket cerrado),
+        caduca en _ts + ttl; sin _ts (documento recién creado) se cuenta desde ahora.
+        """
+        repair_id = doc["id"]
+        ttl = doc.get("ttl")
+        expires_at = None
+        if isinstance(ttl, (int, float)) and ttl > 0:
+            expires_at = float(doc.get("_ts") or self._clock()) + ttl
+
+        terms: Dict[str, int] = {}
+        for token in tokenize(f"{doc.get('item') or ''} {doc.get('description') or ''}"):
+            terms[token] = terms.get(token, 0) + 1
+
+        with self._lock:
+            self._remove_locked(repair_id)
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[repair_id] = tf
+            self._doc_terms[repair_id] = terms
+            length = sum(terms.values())
+            self._doc_len[repair_id] = length
+            self._total_len += length
+            self._docs[repair_id] = {field: doc.get(field) for field in SNAPSHOT_FIELDS}
+            if expires_at is not None:
+                self._expires_at[repair_id] = expires_at
+                heapq.heappush(self._expiry_heap, (expires_at, repair_id))
+
+    def search(
+        self, query: str, tenant: str, limit: int = 10
+    ) -> Tuple[int, List[Tuple[float, Dict[str, Any]]]]:
+        """
+        Busca query entre los tickets de tenant y devuelve
+        (total de coincidencias, [(score, ticket)]) con como mucho limit resultados.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+        limit = max(1, min(limit, MAX_RESULTS))
+
+        with self._lock:
+            self._evict_expired_locked(self._clock())
+            n_docs = len(self._docs)
+            if not terms or not n_docs:
+                return 0, []
+            avg_len = self._total_len / n_docs
+
+            scores: Dict[str, float] = {}
+            allowed: Dict[str, bool] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = _idf(n_docs, df)
+                for repair_id, tf in postings.items():
+                    if repair_id not in allowed:
+                        allowed[repair_id] = tenant_of(self._docs[repair_id]["created_by"]) == tenant
+                    if not allowed[repair_id]:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[repair_id] / avg_len)
+                    scores[repair_id] = scores.get(repair_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+            hits = [(round(score, 4), dict(self._docs[repair_id])) for repair_id, score in ranked]
+        return len(scores), hits
+
+
+def _idf(n_docs: int, df: int) -> float:
+    """IDF de BM25 (variante con +1 para que nunca sea negativa)."""
+    return log(1 + (n_docs - df + 0.5) / (df + 0.5))
@@ -0,0 +1,20 @@
+"""Fixtures comunes de los tests (no necesitan Cosmos DB)."""
+import pytest
+
+
+@pytest.fixture
+def make_repair():
+    """Factoría de tickets con los campos que guarda la API; extra añade o pisa campos."""
+    def factory(repair_id, item, description, status="New", created_by="tenant-a|conv-1", **extra):
+        return {
+            "id": repair_id,
+            "item": item,
+            "description": description,
+            "status": status,
+            "assigned_to": None,
+            "created_at": "2024-10-21T09:15:00.000000Z",
+            "created_by": created_by,
+            **extra,
+        }
+
+    return factory
@@ -0,0 +1,57 @@
+"""Tests de ChangeFeedFollower con un change feed simulado en memoria."""
+from change_feed import ChangeFeedFollower
+
+
+class FakeChangeFeed:
+    """Devuelve las páginas indicadas en orden; después, páginas vacías."""
+
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.calls = []
+
+    def __call__(self, cursor, page_size):
+        self.calls.append(cursor)
+        docs = self.pages.pop(0) if self.pages else []
+        return docs, f"cursor-{len(self.calls)}"
+
+
+def test_catch_up_reads_until_an_empty_page():
+    # Páginas cortas (un rango de particiones cada vez) no cortan la lectura
+    feed = FakeChangeFeed([[{"id": "1"}], [{"id": "2"}, {"id": "3"}]])
+    seen = []
+    follower = ChangeFeedFollower(feed, consumers=[seen.append], page_size=500)
+
+    assert follower.catch_up() == 3
+    assert [doc["id"] for doc in seen] == ["1", "2", "3"]
+    assert feed.calls == [None, "cursor-1", "cursor-2"]
+    assert follower.cursor == "cursor-3"
+
+
+def test_catch_up_feeds_every_consumer():
+    feed = FakeChangeFeed([[{"id": "1"}]])
+    first, second = [], []
+    follower = ChangeFeedFollower(feed, consumers=[first.append, second.append])
+
+    follower.catch_up()
+
+    assert first == second == [{"id": "1"}]
+
+
+def test_catch_up_continues_from_last_cursor():
+    feed = FakeChangeFeed([[{"id": "1"}]])
+    follower = ChangeFeedFollower(feed, consumers=[lambda doc: None])
+    follower.catch_up()
+
+    feed.pages.append([{"id": "2"}])
+    assert follower.catch_up() == 1
+    assert feed.calls[2] == "cursor-2"
+
+
+def test_catch_up_respects_min_interval():
+    feed = FakeChangeFeed([[{"id": "1"}]])
+    follower = ChangeFeedFollower(feed, consumers=[lambda doc: None])
+    follower.catch_up()
+    calls = len(feed.calls)
+
+    assert follower.catch_up(min_interval=3600) == 0
+    assert len(feed.calls) == calls
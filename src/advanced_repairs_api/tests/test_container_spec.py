@@ -0,0 +1,57 @@
+"""Tests de la definición compartida del contenedor (container_spec.py + .json)."""
+import copy
+from pathlib import Path
+
+import pytest
+
+from container_spec import CONTAINER_SPEC, diff_container_spec
+
+SERVICE_DIR = Path(__file__).resolve().parents[1]
+REPAIRS_API_DIR = SERVICE_DIR.parent / "repairs_api"
+
+
+def live_properties():
+    """Propiedades como las devuelve container.read() para un contenedor al día."""
+    policy = copy.deepcopy(CONTAINER_SPEC["indexing_policy"])
+    # Cosmos devuelve los enums con otra capitalización y los paths en otro orden
+    policy["indexingMode"] = "Consistent"
+    policy["includedPaths"].reverse()
+    for composite in policy["compositeIndexes"]:
+        for path in composite:
+            path["order"] = "Ascending"
+    return {
+        "id": "repairs",
+        "indexingPolicy": policy,
+        "defaultTtl": -1,
+        "partitionKey": {"paths": ["/id"], "kind": "Hash"},
+    }
+
+
+@pytest.mark.parametrize("name", ["container_spec.py", "container_spec.json"])
+def test_copies_match_repairs_api(name):
+    if not REPAIRS_API_DIR.is_dir():
+        pytest.skip("repairs_api no está junto a este servicio")
+    assert (SERVICE_DIR / name).read_bytes() == (REPAIRS_API_DIR / name).read_bytes()
+
+
+def test_matching_container_has_no_differences():
+    assert diff_container_spec(live_properties()) == []
+
+
+def test_reports_every_declared_difference():
+    properties = live_properties()
+    properties["indexingPolicy"]["indexingMode"] = "none"
+    properties["indexingPolicy"]["excludedPaths"] = [{"path": '/"_etag"/?'}]
+    properties["indexingPolicy"]["compositeIndexes"] = []
+    properties["defaultTtl"] = None
+    properties["partitionKey"]["paths"] = ["/tenant"]
+
+    keys = [difference.split(":")[0] for difference in diff_container_spec(properties)]
+
+    assert keys == [
+        "indexingMode",
+        "excludedPaths",
+        "compositeIndexes",
+        "defaultTtl",
+        "partitionKey",
+    ]
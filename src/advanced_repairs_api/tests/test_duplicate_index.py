@@ -0,0 +1,103 @@
+"""Tests de la detección de duplicados con MinHash + LSH (no necesitan Cosmos DB)."""
+from duplicate_index import (
+    BANDS,
+    DUPLICATE_THRESHOLD,
+    NUM_PERM,
+    ROWS,
+    RepairDuplicateIndex,
+    jaccard,
+    minhash,
+    shingles,
+)
+
+CLOSED = {"Completed", "Closed", "Cancelled"}
+
+
+def test_minhash_is_deterministic_and_estimates_jaccard():
+    a = shingles("Laptop", "screen flickering goes black after a few minutes")
+    b = shingles("Laptop", "screen flickering goes black")
+
+    sig_a, sig_b = minhash(a), minhash(b)
+    assert len(sig_a) == NUM_PERM
+    assert sig_a == minhash(a)
+
+    estimate = sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERM
+    assert abs(estimate - jaccard(a, b)) < 0.25
+
+
+def test_jaccard():
+    assert jaccard(frozenset({"a", "b"}), frozenset({"b", "c"})) == 1 / 3
+    assert jaccard(frozenset(), frozenset({"a"})) == 0.0
+
+
+def test_finds_near_duplicate_in_same_tenant(make_repair):
+    index = RepairDuplicateIndex(CLOSED)
+    index.add(make_repair("1", "Laptop", "Screen is flickering and sometimes goes black"))
+    index.add(make_repair("2", "Printer", "Paper jam on every print job"))
+
+    matches = index.find_duplicates(
+        "Laptop", "The screen flickering, sometimes goes black", tenant="tenant-a"
+    )
+
+    assert [doc["id"] for _, doc in matches] == ["1"]
+    assert matches[0][0] >= DUPLICATE_THRESHOLD
+
+
+def test_dissimilar_repairs_are_not_duplicates(make_repair):
+    index = RepairDuplicateIndex(CLOSED)
+    index.add(make_repair("1", "Laptop", "Screen is flickering and sometimes goes black"))
+
+    assert index.find_duplicates("Laptop", "Battery does not charge", tenant="tenant-a") == []
+
+
+def test_lsh_candidates_below_threshold_are_rejected(make_repair):
+    description = "screen flickering black keyboard broken fan noisy"
+    index = RepairDuplicateIndex(CLOSED)
+    index.add(make_repair("1", "Laptop", description))
+
+    # Comparten una banda LSH, así que el ticket llega como candidato...
+    stored_tokens = shingles("Laptop", description)
+    query_tokens = shingles("Laptop", "screen flickering")
+    stored, query = minhash(stored_tokens), minhash(query_tokens)
+    shared_bands = [
+        band for band in range(BANDS)
+        if stored[band * ROWS:(band + 1) * ROWS] == query[band * ROWS:(band + 1) * ROWS]
+    ]
+    assert shared_bands
+    # ...pero el Jaccard exacto (3/8) queda por debajo del umbral y se descarta
+    assert jaccard(stored_tokens, query_tokens) < DUPLICATE_THRESHOLD
+
+    assert index.find_duplicates("Laptop", "screen flickering", tenant="tenant-a") == []
+
+
+def test_duplicates_are_scoped_to_tenant(make_repair):
+    index = RepairDuplicateIndex(CLOSED)
+    index.add(make_repair("1", "Laptop", "Screen flickering", created_by="tenant-b|c2"))
+
+    assert index.find_duplicates("Laptop", "Screen flickering", tenant="tenant-a") == []
+    assert len(index.find_duplicates("Laptop", "Screen flickering", tenant="tenant-b")) == 1
+
+
+def test_closed_repairs_leave_the_index(make_repair):
+    index = RepairDuplicateIndex(CLOSED)
+    index.add(make_repair("1", "Laptop", "Screen flickering"))
+    index.add(make_repair("1", "Laptop", "Screen flickering", status="Completed"))
+
+    assert len(index) == 0
+    assert index.find_duplicates("Laptop", "Screen flickering", tenant="tenant-a") == []
+
+
+def test_results_are_sorted_and_limited(make_repair):
+    index = RepairDuplicateIndex(CLOSED)
+    index.add(make_repair("exact", "Laptop", "screen flickering goes black"))
+    index.add(make_repair("close", "Laptop", "screen flickering goes black often"))
+    for i in range(5):
+        index.add(make_repair(f"copy-{i}", "Laptop", "screen flickering goes black"))
+
+    matches = index.find_duplicates("Laptop", "screen flickering goes black", tenant="tenant-a")
+
+    assert len(matches) == 3
+    assert [similarity for similarity, _ in matches] == sorted(
+        (similarity for similarity, _ in matches), reverse=True
+    )
+    assert "close" not in [doc["id"] for _, doc in matches]
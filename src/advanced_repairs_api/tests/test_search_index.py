@@ -0,0 +1,99 @@
+"""Tests del índice de búsqueda en memoria (no necesitan Cosmos DB)."""
+from search_index import MAX_RESULTS, RepairSearchIndex, tenant_of, tokenize
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_tokenize_normalizes_case_accents_stopwords_and_plurals():
+    assert tokenize("Any other tickets about flickering SCREENS?") == [
+        "ticket", "flickering", "screen",
+    ]
+    assert tokenize("La pantalla parpadeá") == ["pantalla", "parpadea"]
+    # 'ss' final y palabras cortas no se recortan
+    assert tokenize("glass bus") == ["glass", "bus"]
+
+
+def test_tenant_of_takes_first_part_of_created_by():
+    assert tenant_of("tenant-a|conv-1") == "tenant-a"
+    assert tenant_of("tenant-a") == "tenant-a"
+    assert tenant_of(None) == "unknown"
+
+
+def test_search_ranks_more_relevant_repairs_first(make_repair):
+    index = RepairSearchIndex()
+    index.add(make_repair("1", "Laptop", "Screen is flickering and goes black"))
+    index.add(make_repair("2", "Monitor", "Flickering screen, flickering all day"))
+    index.add(make_repair("3", "Printer", "Paper jam on every print job"))
+
+    total, hits = index.search("flickering screens", tenant="tenant-a")
+
+    assert total == 2
+    assert [doc["id"] for _, doc in hits] == ["2", "1"]
+    assert hits[0][0] > hits[1][0] > 0
+
+
+def test_search_is_scoped_to_tenant(make_repair):
+    index = RepairSearchIndex()
+    index.add(make_repair("1", "Laptop", "Screen flickering", created_by="tenant-a|c1"))
+    index.add(make_repair("2", "Laptop", "Screen flickering", created_by="tenant-b|c2"))
+
+    total, hits = index.search("flickering", tenant="tenant-b")
+
+    assert total == 1
+    assert hits[0][1]["id"] == "2"
+    assert index.search("flickering", tenant="tenant-c") == (0, [])
+
+
+def test_search_limit_is_bounded(make_repair):
+    index = RepairSearchIndex()
+    for i in range(MAX_RESULTS + 5):
+        index.add(make_repair(str(i), "Laptop", "Battery does not charge"))
+
+    total, hits = index.search("battery", tenant="tenant-a", limit=1000)
+
+    assert total == MAX_RESULTS + 5
+    assert len(hits) == MAX_RESULTS
+
+
+def test_add_replaces_previous_version_of_a_repair(make_repair):
+    index = RepairSearchIndex()
+    index.add(make_repair("1", "Laptop", "Screen flickering"))
+    index.add(make_repair("1", "Laptop", "Battery does not charge"))
+
+    assert len(index) == 1
+    assert index.search("flickering", tenant="tenant-a") == (0, [])
+    assert index.search("battery", tenant="tenant-a")[0] == 1
+
+
+def test_closed_repairs_are_evicted_when_ttl_expires(make_repair):
+    clock = FakeClock()
+    index = RepairSearchIndex(clock=clock)
+    index.add(make_repair("1", "Laptop", "Screen flickering", status="Completed",
+                          ttl=100, _ts=clock.now - 50))
+    # Sin _ts (recién creado) la caducidad se cuenta desde ahora
+    index.add(make_repair("2", "Laptop", "Screen flickering", status="Completed", ttl=100))
+
+    assert index.search("flickering", tenant="tenant-a")[0] == 2
+
+    clock.now += 60
+    total, hits = index.search("flickering", tenant="tenant-a")
+    assert total == 1
+    assert hits[0][1]["id"] == "2"
+    assert len(index) == 1
+
+
+def test_reopened_repair_is_not_evicted(make_repair):
+    clock = FakeClock()
+    index = RepairSearchIndex(clock=clock)
+    index.add(make_repair("1", "Laptop", "Screen flickering", status="Completed", ttl=100))
+    index.add(make_repair("1", "Laptop", "Screen flickering", status="In Progress", ttl=-1))
+
+    clock.now += 1000
+
+    assert index.search("flickering", tenant="tenant-a")[0] == 1
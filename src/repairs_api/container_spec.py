@@ -0,0 +1,73 @@
+"""container_spec.py - Definición declarada del contenedor de tickets en Cosmos DB.
+
+La partition key, la política de indexado y el TTL están en container_spec.json.
+repairs_api y advanced_repairs_api usan el mismo contenedor y cada una es su propio
+contexto de Docker, así que las dos llevan una copia idéntica de este módulo y del
+JSON (advanced_repairs_api/tests/test_container_spec.py falla si se separan).
+
+- Solo se indexan los campos por los que filtramos u ordenamos; description e item
+  quedan fuera, así los inserts no pagan RU por indexar texto libre.
+- Los índices compuestos (status|created_by, created_at) son una optimización: las
+  consultas usan ORDER BY c.created_at, que funciona también sin ellos.
+- default_ttl = -1: nada caduca salvo los tickets cerrados, que llevan su propio ttl.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CONTAINER_SPEC: Dict[str, Any] = json.loads(
+    Path(__file__).with_name("container_spec.json").read_text(encoding="utf-8")
+)
+INDEXING_POLICY: Dict[str, Any] = CONTAINER_SPEC["indexing_policy"]
+
+# Estados que cierran un ticket; los tickets cerrados llevan ttl
+CLOSED_STATUSES = set(CONTAINER_SPEC["closed_statuses"])
+
+# Segundos que se conserva un ticket cerrado antes de que Cosmos lo borre (90 días)
+CLOSED_TICKET_TTL_SECONDS = int(os.getenv("CLOSED_TICKET_TTL_SECONDS", str(90 * 24 * 3600)))
+
+
+def normalize_policy(policy: Dict[str, Any]) -> Dict[str, Any]:
+    """Deja solo las partes de la política que declaramos, en forma comparable."""
+    def paths(key: str) -> List[str]:
+        return sorted(p["path"] for p in policy.get(key, []))
+
+    return {
+        "indexingMode": policy.get("indexingMode", "consistent").lower(),
+        "includedPaths": paths("includedPaths"),
+        "excludedPaths": paths("excludedPaths"),
+        "compositeIndexes": sorted(
+            [(c["path"], c.get("order", "ascending").lower()) for c in composite]
+            for composite in policy.get("compositeIndexes", [])
+        ),
+    }
+
+
+def diff_container_spec(properties: Dict[str, Any]) -> List[str]:
+    """
+    Compara las propiedades en vivo del contenedor (container.read()) con
+    CONTAINER_SPEC. Devuelve las diferencias legibles (vacío si coinciden).
+    """
+    differences = []
+
+    live = normalize_policy(properties.get("indexingPolicy", {}))
+    declared = normalize_policy(INDEXING_POLICY)
+    for key, declared_value in declared.items():
+        if live[key] != declared_value:
+            differences.append(f"{key}: live={live[key]} declared={declared_value}")
+
+    # Sin defaultTtl Cosmos ignora el ttl de los tickets cerrados: nunca caducan
+    live_ttl = properties.get("defaultTtl")
+    if live_ttl != CONTAINER_SPEC["default_ttl"]:
+        differences.append(f"defaultTtl: live={live_ttl} declared={CONTAINER_SPEC['default_ttl']}")
+
+    live_pk = properties.get("partitionKey", {}).get("paths", [])
+    if live_pk != [CONTAINER_SPEC["partition_key"]]:
+        differences.append(f"partitionKey: live={live_pk} declared={[CONTAINER_SPEC['partition_key']]}")
+
+    return differences
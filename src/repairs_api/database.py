@@ -1,11 +1,14 @@
 """database.py using Cosmos DB"""
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 from uuid import uuid4
 
 from dotenv import load_dotenv
-from azure.cosmos import CosmosClient, PartitionKey
+from azure.cosmos import CosmosClient
+
+from container_spec import CLOSED_STATUSES, CLOSED_TICKET_TTL_SECONDS
+from provisioning import ensure_container
 
 load_dotenv()
 
@@ -19,12 +22,18 @@ if not COSMOS_ENDPOINT or not COSMOS_KEY:
 
 client = CosmosClient(COSMOS_ENDPOINT, COSMOS_KEY)
 
-# Ensure DB & container exist (safe if already created)
+# Ensure DB & container exist (safe if already created).
+# Partition key, indexing policy and TTL are declared in container_spec.json.
 database = client.create_database_if_not_exists(id=COSMOS_DATABASE)
-container = database.create_container_if_not_exists(
-    id=COSMOS_CONTAINER,
-    partition_key=PartitionKey(path="/id"),
-)
+container = ensure_container(database, COSMOS_CONTAINER)
+
+def utc_timestamp(value: Optional[datetime] = None) -> str:
+    """Fixed-width UTC timestamp (2024-10-21T09:15:00.000000Z), sortable as text."""
+    if value is None:
+        value = datetime.now(timezone.utc)
+    elif value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
 
 def create_repair_in_db(
     item: str,
@@ -34,7 +43,7 @@ def create_repair_in_db(
     created_by: Optional[str] = None,
 ) -> Dict[str, Any]:
     repair_id = str(uuid4())
-    created_at = datetime.utcnow().isoformat() + "Z"
+    created_at = utc_timestamp()
 
     doc = {
         "id": repair_id,
@@ -45,6 +54,9 @@ def create_repair_in_db(
         "created_at": created_at,
         "created_by": created_by
     }
+    if status in CLOSED_STATUSES:
+        # Closed tickets expire automatically (container default_ttl = -1)
+        doc["ttl"] = CLOSED_TICKET_TTL_SECONDS
 
     container.create_item(body=doc)
     return doc
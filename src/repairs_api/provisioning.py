@@ -0,0 +1,134 @@
+"""provisioning.py - Declarative provisioning of the repairs container in Cosmos DB.
+
+The container definition (partition key, indexing policy and TTL) lives in
+container_spec.json (loaded by container_spec.py, shared with advanced_repairs_api).
+database.py uses ensure_container() at startup, and this file can also be run
+as a small command line tool:
+
+    python provisioning.py check            # compare live policy with CONTAINER_SPEC
+    python provisioning.py apply            # replace the live policy with CONTAINER_SPEC
+    python provisioning.py bench --count 50 # RU per insert: default vs declared policy
+"""
+import argparse
+import sys
+import time
+from typing import Any, Dict, List
+from uuid import uuid4
+
+from azure.cosmos import DatabaseProxy, PartitionKey
+
+from container_spec import CONTAINER_SPEC, diff_container_spec
+
+
+def ensure_container(database: DatabaseProxy, container_id: str):
+    """Create the container from CONTAINER_SPEC if it does not exist yet."""
+    return database.create_container_if_not_exists(
+        id=container_id,
+        partition_key=PartitionKey(path=CONTAINER_SPEC["partition_key"]),
+        indexing_policy=CONTAINER_SPEC["indexing_policy"],
+        default_ttl=CONTAINER_SPEC["default_ttl"],
+    )
+
+
+def apply_container_spec(database: DatabaseProxy, container_id: str):
+    """Replace the indexing policy and TTL of an existing container with CONTAINER_SPEC."""
+    return database.replace_container(
+        container_id,
+        partition_key=PartitionKey(path=CONTAINER_SPEC["partition_key"]),
+        indexing_policy=CONTAINER_SPEC["indexing_policy"],
+        default_ttl=CONTAINER_SPEC["default_ttl"],
+    )
+
+
+def _sample_doc() -> Dict[str, Any]:
+    """A repair document with a realistic (long) free-text description."""
+    return {
+        "id": str(uuid4()),
+        "item": "Laptop",
+        "description": (
+            "Screen is flickering and sometimes goes black after a few minutes. "
+            "The issue started after the last driver update and happens both on "
+            "battery and when plugged in. External monitor works fine. "
+        ) * 4,
+        "status": "New",
+        "assigned_to": "Tier 1 Support",
+        "created_at": "2024-10-21T09:15:00.000000Z",
+        "created_by": "bench",
+    }
+
+
+def benchmark_insert_ru(database: DatabaseProxy, count: int) -> Dict[str, float]:
+    """
+    Insert count sample documents into two temporary containers, one with the
+    default "index everything" policy and one with CONTAINER_SPEC, and return
+    the average RU per insert of each. The temporary containers are deleted.
+    """
+    results: Dict[str, float] = {}
+    variants = {
+        "default": {},
+        "declared": {
+            "indexing_policy": CONTAINER_SPEC["indexing_policy"],
+            "default_ttl": CONTAINER_SPEC["default_ttl"],
+        },
+    }
+
+    for name, options in variants.items():
+        container_id = f"bench-{name}-{uuid4().hex[:8]}"
+        bench_container = database.create_container(
+            id=container_id,
+            partition_key=PartitionKey(path=CONTAINER_SPEC["partition_key"]),
+            **options,
+        )
+        try:
+            total_charge = 0.0
+            for _ in range(count):
+                bench_container.create_item(_sample_doc())
+                headers = bench_container.client_connection.last_response_headers
+                total_charge += float(headers.get("x-ms-request-charge", 0))
+            results[name] = total_charge / count
+        finally:
+            database.delete_container(container_id)
+
+    return results
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Provision the repairs container.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("check", help="Compare the live container with CONTAINER_SPEC.")
+    subparsers.add_parser("apply", help="Apply CONTAINER_SPEC to the live container.")
+    bench = subparsers.add_parser("bench", help="Measure RU per insert with each policy.")
+    bench.add_argument("--count", type=int, default=50, help="Documents to insert per policy.")
+    args = parser.parse_args(argv)
+
+    # Importing database creates the container from CONTAINER_SPEC if needed
+    from database import COSMOS_CONTAINER, container, database
+
+    if args.command == "check":
+        differences = diff_container_spec(container.read())
+        if not differences:
+            print(f"Container '{COSMOS_CONTAINER}' matches CONTAINER_SPEC.")
+            return 0
+        print(f"Container '{COSMOS_CONTAINER}' differs from CONTAINER_SPEC:")
+        for difference in differences:
+            print(f"  - {difference}")
+        return 1
+
+    if args.command == "apply":
+        apply_container_spec(database, COSMOS_CONTAINER)
+        print(f"Applied CONTAINER_SPEC to '{COSMOS_CONTAINER}' (reindexing runs in the background).")
+        return 0
+
+    start = time.perf_counter()
+    results = benchmark_insert_ru(database, args.count)
+    elapsed = time.perf_counter() - start
+    print(f"RU per insert ({args.count} docs per policy, {elapsed:.1f}s):")
+    for name, charge in results.items():
+        print(f"  {name:<9} {charge:.2f} RU")
+    saving = 1 - results["declared"] / results["default"]
+    print(f"  saving    {saving:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))